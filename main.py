@@ -3,18 +3,54 @@ FastAPI server: WebSocket for telemetry + control. Physics loop at ~60 Hz.
 """
 
 import asyncio
-import json
+import logging
 from contextlib import asynccontextmanager
 
+import msgspec
+import orjson
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 
 from physics import AircraftState, update_physics, state_to_telemetry
 
+logger = logging.getLogger(__name__)
+
 # Global state
 _state: AircraftState | None = None
-_control = {"throttle": 0.0, "elevator": 0.0, "aileron": 0.0, "rudder": 0.0}
-_ws_connections: list[WebSocket] = []
+# (throttle, elevator, aileron, rudder). The WebSocket handler replaces the whole
+# tuple, so the physics loop reads a consistent set with a single lookup.
+_control: tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0)
+# Each connected client maps to (one-slot queue holding its next frame,
+# ticks between frames it wants).
+_ws_connections: dict[WebSocket, tuple[asyncio.Queue, int]] = {}          # JSON text frames
+_ws_msgpack_connections: dict[WebSocket, tuple[asyncio.Queue, int]] = {}  # MessagePack binary frames
+# Last telemetry dict and its encodings, reused while the telemetry is unchanged.
+_last_telemetry: dict | None = None
+_last_json: str | None = None
+_last_msgpack: bytes | None = None
+
+# Clients that offer this WebSocket subprotocol get telemetry as MessagePack.
+MSGPACK_SUBPROTOCOL = "msgpack"
+_msgpack_encoder = msgspec.msgpack.Encoder()
+
+
+class ControlMsg(msgspec.Struct):
+    """Inbound control message; omitted fields leave that control unchanged."""
+    throttle: float | None = None
+    elevator: float | None = None
+    aileron: float | None = None
+    rudder: float | None = None
+
+
+# strict=False keeps accepting numeric strings such as "0.5", as float() did.
+_control_decoder = msgspec.json.Decoder(ControlMsg, strict=False)
+# (lo, hi) per control, in _control / ControlMsg field order.
+_CONTROL_LIMITS = ((0.0, 1.0), (-1.0, 1.0), (-1.0, 1.0), (-1.0, 1.0))
+
+PHYSICS_HZ = 60
+# Max physics ticks run back-to-back to catch up after a stall; beyond this
+# the backlog is dropped and the clock resynced.
+MAX_CATCHUP_TICKS = 5
 
 # Auto-reset bounds
 ALTITUDE_MIN, ALTITUDE_MAX = -200.0, 50000.0
@@ -32,54 +68,94 @@ def _make_initial_state() -> AircraftState:
 
 
 def reset_sim() -> None:
-    global _state
-    _control["throttle"] = 0.0
-    _control["elevator"] = 0.0
-    _control["aileron"] = 0.0
-    _control["rudder"] = 0.0
+    global _state, _control
+    _control = (0.0, 0.0, 0.0, 0.0)
     _state = _make_initial_state()
 
 
-def _out_of_bounds(state: dict) -> bool:
-    alt = state.get("altitude", 0.0)
-    if alt < ALTITUDE_MIN or alt > ALTITUDE_MAX:
-        return True
-    if abs(state.get("x", 0.0)) > POSITION_ABS_MAX or abs(state.get("y", 0.0)) > POSITION_ABS_MAX:
-        return True
-    return False
+def _push_latest(queue: asyncio.Queue, frame) -> None:
+    """Queue frame for a client, replacing any frame it has not sent yet."""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(frame)
+
+
+async def _send_frames(ws: WebSocket, queue: asyncio.Queue, conns: dict) -> None:
+    # Per-client writer: a slow client only ever falls behind by dropping its
+    # own stale frames; it never holds up the physics loop or other clients.
+    send = ws.send_bytes if conns is _ws_msgpack_connections else ws.send_text
+    try:
+        while True:
+            await send(await queue.get())
+    except Exception:
+        conns.pop(ws, None)
+
+
+def _frame_interval(ws: WebSocket) -> int:
+    """Ticks between telemetry frames for a client, from its optional ?rate=<Hz>."""
+    try:
+        rate = float(ws.query_params.get("rate", PHYSICS_HZ))
+        return max(1, round(PHYSICS_HZ / rate)) if rate > 0 else 1
+    except (ValueError, OverflowError):
+        return 1
+
+
+def _out_of_bounds(state: AircraftState) -> bool:
+    alt = -state.z
+    return (
+        alt < ALTITUDE_MIN or alt > ALTITUDE_MAX
+        or abs(state.x) > POSITION_ABS_MAX or abs(state.y) > POSITION_ABS_MAX
+    )
 
 
 async def physics_loop():
-    global _state
-    dt = 1.0 / 60.0
+    global _state, _last_telemetry, _last_json, _last_msgpack
+    dt = 1.0 / PHYSICS_HZ
+    tick = 0
     _state = _make_initial_state()
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time() + dt
     while True:
-        await asyncio.sleep(dt)
+        # Sleep until an absolute deadline rather than a fixed dt, so the time
+        # spent on each tick doesn't accumulate and the loop holds 60 Hz.
+        await asyncio.sleep(max(0.0, next_tick - loop.time()))
+        # If we woke up late, run every physics tick that has come due (at the
+        # fixed dt) before broadcasting once, so sim time keeps up with real time.
+        due = 1 + int((loop.time() - next_tick) / dt)
+        if due > MAX_CATCHUP_TICKS:
+            due = 1
+            next_tick = loop.time()
+        next_tick += due * dt
+        tick += 1
         try:
-            _state = AircraftState(
-                **{**vars(_state),
-                   "throttle": _control["throttle"],
-                   "elevator": _control["elevator"],
-                   "aileron":  _control["aileron"],
-                   "rudder":   _control["rudder"]}
-            )
-            _state = update_physics(_state, dt)
-            state = state_to_telemetry(_state)
-            if _out_of_bounds(state):
+            # update_physics returns a fresh state, so writing the controls
+            # into the current one is safe and avoids rebuilding it each tick.
+            _state.throttle, _state.elevator, _state.aileron, _state.rudder = _control
+            _state = update_physics(_state, dt, due)
+            if _out_of_bounds(_state):
                 reset_sim()
-                state = state_to_telemetry(_state)
-            msg = json.dumps(state)
-            dead = []
-            for ws in _ws_connections:
-                try:
-                    await ws.send_text(msg)
-                except Exception:
-                    dead.append(ws)
-            for ws in dead:
-                _ws_connections.remove(ws)
+            state = state_to_telemetry(_state)
+            # Telemetry is rounded, so an idle aircraft produces identical
+            # frames tick after tick; only re-encode when something changed.
+            if state != _last_telemetry:
+                _last_telemetry = state
+                # orjson returns bytes; decode once so clients keep getting text frames.
+                _last_json = orjson.dumps(state).decode()
+                _last_msgpack = None
+            # Physics always runs at PHYSICS_HZ; clients that asked for a lower
+            # rate only get every n-th frame.
+            for queue, every in _ws_connections.values():
+                if tick % every == 0:
+                    _push_latest(queue, _last_json)
+            if _ws_msgpack_connections:
+                if _last_msgpack is None:
+                    _last_msgpack = _msgpack_encoder.encode(state)
+                for queue, every in _ws_msgpack_connections.values():
+                    if tick % every == 0:
+                        _push_latest(queue, _last_msgpack)
         except Exception as e:
-            import logging
-            logging.error(f"Physics loop error: {e}", exc_info=True)
+            # One-shot: the sim is reset right after, so the traceback is worth it.
+            logger.error("Physics loop error: %s", e, exc_info=True)
             reset_sim()
 
 
@@ -112,32 +188,44 @@ def reset():
 
 @app.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
-    await ws.accept()
-    _ws_connections.append(ws)
-    # Send current state immediately so the client gets the first frame without
-    # waiting up to 1/60 s for the next physics tick.
-    try:
-        if _state:
-            await ws.send_text(json.dumps(state_to_telemetry(_state)))
-    except Exception:
-        pass
+    global _control, _last_msgpack
+    use_msgpack = MSGPACK_SUBPROTOCOL in ws.scope.get("subprotocols", [])
+    await ws.accept(subprotocol=MSGPACK_SUBPROTOCOL if use_msgpack else None)
+    conns = _ws_msgpack_connections if use_msgpack else _ws_connections
+    queue = asyncio.Queue(maxsize=1)
+    # Queue the latest frame immediately so the client doesn't wait up to
+    # 1/60 s for the next physics tick; reuse the loop's encoding when there is one.
+    if _last_telemetry is not None:
+        if not use_msgpack:
+            queue.put_nowait(_last_json)
+        else:
+            if _last_msgpack is None:
+                _last_msgpack = _msgpack_encoder.encode(_last_telemetry)
+            queue.put_nowait(_last_msgpack)
+    elif _state:
+        state = state_to_telemetry(_state)
+        if use_msgpack:
+            queue.put_nowait(_msgpack_encoder.encode(state))
+        else:
+            queue.put_nowait(orjson.dumps(state).decode())
+    conns[ws] = (queue, _frame_interval(ws))
+    sender = asyncio.create_task(_send_frames(ws, queue, conns))
     try:
         while True:
             raw = await ws.receive_text()
             try:
-                data = json.loads(raw)
-                if "throttle" in data:
-                    _control["throttle"] = max(0.0, min(1.0, float(data["throttle"])))
-                if "elevator" in data:
-                    _control["elevator"] = max(-1.0, min(1.0, float(data["elevator"])))
-                if "aileron" in data:
-                    _control["aileron"] = max(-1.0, min(1.0, float(data["aileron"])))
-                if "rudder" in data:
-                    _control["rudder"] = max(-1.0, min(1.0, float(data["rudder"])))
-            except (json.JSONDecodeError, TypeError, ValueError):
-                pass
+                msg = _control_decoder.decode(raw)
+            except msgspec.DecodeError:
+                continue
+            # Inline clamp; like max(lo, min(hi, v)) it maps NaN to hi.
+            _control = tuple(
+                old if new is None else lo if new < lo else new if new < hi else hi
+                for new, old, (lo, hi) in zip(
+                    msgspec.structs.astuple(msg), _control, _CONTROL_LIMITS
+                )
+            )
     except WebSocketDisconnect:
         pass
     finally:
-        if ws in _ws_connections:
-            _ws_connections.remove(ws)
+        conns.pop(ws, None)
+        sender.cancel()
@@ -2,13 +2,16 @@
 Minimal flight physics for MVP: 4 forces (lift, weight, thrust, drag) + Euler integration.
 SI units. Body frame: X forward, Y right, Z down (NED).
 State is clamped to sane limits so the sim never overflows or diverges.
+The integration step is compiled with Numba; set NUMBA_DISABLE_JIT=1 to run it as plain Python.
 """
 
 from dataclasses import dataclass
 from math import sin, cos, sqrt, isfinite, pi
 
+from numba import njit
 
-@dataclass
+
+@dataclass(slots=True)
 class AircraftState:
     x: float   # position E (m)
     y: float   # position N (m)
@@ -29,9 +32,12 @@ class AircraftState:
 
 
 MASS = 1000.0       # kg (light aircraft)
+INV_MASS = 1.0 / MASS
 G = 9.81            # m/s^2
 WEIGHT = MASS * G   # N — downward force; lift must balance this in level flight
 WING_AREA = 16.2
+RHO = 1.225         # kg/m^3, sea-level air density
+HALF_RHO_S = 0.5 * RHO * WING_AREA  # dynamic pressure x wing area = HALF_RHO_S * v^2
 CL0 = 1.1          # lift at zero alpha: ~weight at 30 m/s
 CL_ALPHA = 4.0     # per radian
 CD0 = 0.035         # parasitic drag
@@ -47,82 +53,108 @@ MAX_ANGLE = pi
 MAX_ANGULAR_RATE = 4.0     # rad/s
 POS_LIMIT = 1e6            # m
 
+RAD_TO_DEG = 180.0 / pi    # telemetry reports angles and rates in degrees
+
+
+@njit(cache=True)
+def _body_to_ned(phi, theta, psi):
+    # Direction cosine matrix (row-major) rotating body-frame vectors into NED.
+    # It is orthogonal, so its transpose rotates NED vectors back into the body frame.
+    cphi, sphi = cos(phi), sin(phi)
+    cth, sth = cos(theta), sin(theta)
+    cpsi, spsi = cos(psi), sin(psi)
+    return (
+        cth * cpsi, sphi * sth * cpsi - cphi * spsi, cphi * sth * cpsi + sphi * spsi,
+        cth * spsi, sphi * sth * spsi + cphi * cpsi, cphi * sth * spsi - sphi * cpsi,
+        -sth, sphi * cth, cphi * cth,
+    )
+
+
+# An explicit signature makes Numba compile (or load from its on-disk cache)
+# at import time, so the first physics tick doesn't pay for the JIT.
+_CORE_SIGNATURE = "UniTuple(float64, 12)(" + ", ".join(["float64"] * 17) + ")"
 
-def update_physics(state: AircraftState, dt: float) -> AircraftState:
-    v_mag = sqrt(state.u * state.u + state.v * state.v + state.w * state.w)
+
+@njit(_CORE_SIGNATURE, cache=True)
+def _update_physics_core(x, y, z, u, v, w, phi, theta, psi, p, q, r,
+                         throttle, elevator, aileron, rudder, dt):
+    # Compiled to native code: flat floats in, 12-tuple (x .. r) out.
+    # No fastmath, so the isfinite() guard on psi is kept.
+    v_mag = sqrt(u * u + v * v + w * w)
     if v_mag < 0.1:
         v_mag = 0.1
-    alpha = state.theta - (state.w / v_mag if v_mag > 0.5 else 0)
-    q_bar = 0.5 * 1.225 * v_mag * v_mag
+    # Velocity direction cosines: divide once, reuse in every force term below.
+    inv_v = 1.0 / v_mag
+    u_hat = u * inv_v
+    w_hat = w * inv_v
+    alpha = theta - (w_hat if v_mag > 0.5 else 0)
+    q_bar_s = HALF_RHO_S * v_mag * v_mag
     cl = CL0 + CL_ALPHA * alpha
     cd = CD0 + K * cl * cl
-    lift = q_bar * WING_AREA * cl
-    drag = q_bar * WING_AREA * cd
-    thrust = THRUST_MAX * state.throttle
+    lift = q_bar_s * cl
+    drag = q_bar_s * cd
+    thrust = THRUST_MAX * throttle
 
     # Body frame: X fwd, Z down. Drag opposes velocity vector (mostly along X when level)
     # Drag force magnitude = drag, direction = opposite to velocity in body frame
     # For small angles, drag_x ≈ -drag * (u/v_mag), drag_z ≈ -drag * (w/v_mag)
-    drag_x = drag * (state.u / v_mag) if v_mag > 0.1 else 0.0
-    drag_z = drag * (state.w / v_mag) if v_mag > 0.1 else 0.0
+    drag_x = drag * u_hat if v_mag > 0.1 else 0.0
+    drag_z = drag * w_hat if v_mag > 0.1 else 0.0
     fx = thrust - drag_x
     # Lift acts perpendicular to velocity (approx along -Z when level), weight always down
-    lift_z = lift * (state.u / v_mag) if v_mag > 0.1 else 0.0  # lift component along body Z (up = -Z)
-    fz = -lift_z - drag_z + WEIGHT * cos(state.theta)  # Z down: -lift - drag_z + weight
+    lift_z = lift * u_hat if v_mag > 0.1 else 0.0  # lift component along body Z (up = -Z)
+    fz = -lift_z - drag_z + WEIGHT * cos(theta)  # Z down: -lift - drag_z + weight
 
     # Ground roll friction: opposes forward motion while wheels are on the ground.
     # Normal force decreases as lift builds, so friction fades naturally near take-off.
-    on_ground = (state.z >= 0)
+    on_ground = (z >= 0)
     if on_ground and v_mag > 0.1:
-        normal = max(0.0, WEIGHT * cos(state.theta) - lift)
-        fx -= ROLLING_MU * normal * (state.u / v_mag)
+        normal = max(0.0, WEIGHT * cos(theta) - lift)
+        fx -= ROLLING_MU * normal * u_hat
 
-    ax = fx / MASS
-    az = fz / MASS
+    ax = fx * INV_MASS
+    az = fz * INV_MASS
     ay = 0.0
 
     # Body angular rates from controls (simplified)
-    p_new = state.p + (state.aileron * 0.6 - state.p * 0.4) * dt
-    q_new = state.q + (state.elevator * 0.6 - state.q * 0.4) * dt
-    r_new = state.r + (state.rudder * 0.4 - state.r * 0.4) * dt
-    phi_new = state.phi + p_new * dt
-    theta_new = state.theta + q_new * dt
-    psi_new = state.psi + r_new * dt
+    p_new = p + (aileron * 0.6 - p * 0.4) * dt
+    q_new = q + (elevator * 0.6 - q * 0.4) * dt
+    r_new = r + (rudder * 0.4 - r * 0.4) * dt
+    phi_new = phi + p_new * dt
+    theta_new = theta + q_new * dt
+    psi_new = psi + r_new * dt
 
     # Body velocity integration (still in current/old body frame)
-    u_int = state.u + ax * dt
-    v_int = state.v + ay * dt
-    w_int = state.w + az * dt
+    u_int = u + ax * dt
+    v_int = v + ay * dt
+    w_int = w + az * dt
 
     # Current (old) body to NED: world velocity after integration step
-    cphi, sphi = cos(state.phi), sin(state.phi)
-    cth, sth = cos(state.theta), sin(state.theta)
-    cpsi, spsi = cos(state.psi), sin(state.psi)
-    u_w = u_int * (cth * cpsi) + v_int * (sphi * sth * cpsi - cphi * spsi) + w_int * (cphi * sth * cpsi + sphi * spsi)
-    v_w = u_int * (cth * spsi) + v_int * (sphi * sth * spsi + cphi * cpsi) + w_int * (cphi * sth * spsi - sphi * cpsi)
-    w_w = u_int * (-sth) + v_int * (sphi * cth) + w_int * (cphi * cth)
+    r00, r01, r02, r10, r11, r12, r20, r21, r22 = _body_to_ned(phi, theta, psi)
+    u_w = u_int * r00 + v_int * r01 + w_int * r02
+    v_w = u_int * r10 + v_int * r11 + w_int * r12
+    w_w = u_int * r20 + v_int * r21 + w_int * r22
 
     # Ground: do not go below z=0. Zero vertical velocity when on ground.
-    if state.z >= 0 and w_w > 0:
+    if z >= 0 and w_w > 0:
         w_w = 0.0
     # Minimum lift-off speed: wheels stay on the ground below V_LOF regardless of
     # pitch/AoA so the aircraft must accelerate down the runway first.
-    if state.z >= 0 and v_mag < V_LOF and w_w < 0:
+    if z >= 0 and v_mag < V_LOF and w_w < 0:
         w_w = 0.0
-    z_new = state.z + w_w * dt
+    z_new = z + w_w * dt
     if z_new > 0:
         z_new = 0.0
         w_w = 0.0
-    x_new = state.x + u_w * dt
-    y_new = state.y + v_w * dt
+    x_new = x + u_w * dt
+    y_new = y + v_w * dt
 
     # Express world velocity (u_w, v_w, w_w) in NEW body frame so (u,v,w) stays consistent with orientation
-    cphi_n, sphi_n = cos(phi_new), sin(phi_new)
-    cth_n, sth_n = cos(theta_new), sin(theta_new)
-    cpsi_n, spsi_n = cos(psi_new), sin(psi_new)
-    u_new = u_w * (cth_n * cpsi_n) + v_w * (cth_n * spsi_n) + w_w * (-sth_n)
-    v_new = u_w * (sphi_n * sth_n * cpsi_n - cphi_n * spsi_n) + v_w * (sphi_n * sth_n * spsi_n + cphi_n * cpsi_n) + w_w * (sphi_n * cth_n)
-    w_new = u_w * (cphi_n * sth_n * cpsi_n + sphi_n * spsi_n) + v_w * (cphi_n * sth_n * spsi_n - sphi_n * cpsi_n) + w_w * (cphi_n * cth_n)
+    # (transpose of the new body->NED matrix).
+    n00, n01, n02, n10, n11, n12, n20, n21, n22 = _body_to_ned(phi_new, theta_new, psi_new)
+    u_new = u_w * n00 + v_w * n10 + w_w * n20
+    v_new = u_w * n01 + v_w * n11 + w_w * n21
+    w_new = u_w * n02 + v_w * n12 + w_w * n22
 
     # Cap airspeed to light-aircraft max (300 km/h): scale velocity vector, preserve direction
     v_mag_new = sqrt(u_new * u_new + v_new * v_new + w_new * w_new)
@@ -145,11 +177,33 @@ def update_physics(state: AircraftState, dt: float) -> AircraftState:
     y_new = max(-POS_LIMIT, min(POS_LIMIT, y_new))
     z_new = max(-POS_LIMIT, min(POS_LIMIT, z_new))
 
+    return (x_new, y_new, z_new, u_new, v_new, w_new,
+            phi_new, theta_new, psi_new, p_new, q_new, r_new)
+
+
+@njit(_CORE_SIGNATURE[:-1] + ", int64)", cache=True)
+def _update_physics_steps(x, y, z, u, v, w, phi, theta, psi, p, q, r,
+                          throttle, elevator, aileron, rudder, dt, n_steps):
+    # Several fixed-dt steps in one native call (catch-up after a late tick).
+    for _ in range(n_steps):
+        x, y, z, u, v, w, phi, theta, psi, p, q, r = _update_physics_core(
+            x, y, z, u, v, w, phi, theta, psi, p, q, r,
+            throttle, elevator, aileron, rudder, dt,
+        )
+    return (x, y, z, u, v, w, phi, theta, psi, p, q, r)
+
+
+def update_physics(state: AircraftState, dt: float, n_steps: int = 1) -> AircraftState:
+    x, y, z, u, v, w, phi, theta, psi, p, q, r = _update_physics_steps(
+        state.x, state.y, state.z, state.u, state.v, state.w,
+        state.phi, state.theta, state.psi, state.p, state.q, state.r,
+        state.throttle, state.elevator, state.aileron, state.rudder, dt, n_steps,
+    )
     return AircraftState(
-        x=x_new, y=y_new, z=z_new,
-        u=u_new, v=v_new, w=w_new,
-        phi=phi_new, theta=theta_new, psi=psi_new,
-        p=p_new, q=q_new, r=r_new,
+        x=x, y=y, z=z,
+        u=u, v=v, w=w,
+        phi=phi, theta=theta, psi=psi,
+        p=p, q=q, r=r,
         throttle=state.throttle, elevator=state.elevator,
         aileron=state.aileron, rudder=state.rudder,
     )
@@ -176,17 +230,17 @@ def state_to_telemetry(state: AircraftState) -> dict:
     vertical_speed = -w_world  # m/s, positive = climbing
     
     return {
-        "x": state.x,
-        "y": state.y,
-        "altitude": -state.z,
-        "phi_deg": round(state.phi * 180 / 3.14159265, 4),
-        "theta_deg": round(state.theta * 180 / 3.14159265, 4),
-        "psi_deg": round(state.psi * 180 / 3.14159265, 4),
+        "x": round(state.x, 2),
+        "y": round(state.y, 2),
+        "altitude": round(-state.z, 2),
+        "phi_deg": round(state.phi * RAD_TO_DEG, 4),
+        "theta_deg": round(state.theta * RAD_TO_DEG, 4),
+        "psi_deg": round(state.psi * RAD_TO_DEG, 4),
         "airspeed": round(v_mag, 2),
         "vertical_speed": round(vertical_speed, 2),  # m/s, positive = up
-        "p_deg_s": round(state.p * 180 / 3.14159265, 2),  # roll rate deg/s
-        "q_deg_s": round(state.q * 180 / 3.14159265, 2),  # pitch rate deg/s
-        "r_deg_s": round(state.r * 180 / 3.14159265, 2),  # yaw rate deg/s
+        "p_deg_s": round(state.p * RAD_TO_DEG, 2),  # roll rate deg/s
+        "q_deg_s": round(state.q * RAD_TO_DEG, 2),  # pitch rate deg/s
+        "r_deg_s": round(state.r * RAD_TO_DEG, 2),  # yaw rate deg/s
         "throttle": state.throttle,
         "physics_engine": "manual",
     }